@@ -1,13 +1,8 @@
 import streamlit as st
-from supabase import create_client
+from db import init_connection, warm_connection
+from prewarm import start_prewarm
 
 # --- SUPABASE CONNECTION ---
-@st.cache_resource
-def init_connection():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
 supabase = init_connection()
 
 # --- PAGE CONFIG ---
@@ -21,6 +16,10 @@ st.set_page_config(
 def login():
     st.title("Bienvenido 👋")
     st.write("Por favor, ingresa tus credenciales para continuar.")
+
+    # Open the pooled connection while the user types, so neither the login
+    # query nor the first page pays for connection and TLS setup (once per process).
+    warm_connection()
     
     with st.form("login_form"):
         username = st.text_input("Usuario")
@@ -38,6 +37,7 @@ def login():
                 user_data = response.data[0]
                 st.session_state["logged_in"] = True
                 st.session_state["user"] = user_data
+                start_prewarm(user_data)
                 st.rerun()
             else:
                 st.error("😕 Usuario o contraseña incorrecta.")
@@ -0,0 +1,48 @@
+import logging
+import threading
+
+import httpx
+import streamlit as st
+from supabase import ClientOptions, create_client
+
+logger = logging.getLogger(__name__)
+
+# One pool for the whole process: every page and session reuses these
+# keep-alive connections instead of opening its own. Idle connections are kept
+# for 5 minutes, so a connection warmed at the login screen survives a slow login.
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=300)
+TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+# --- SUPABASE CONNECTION ---
+@st.cache_resource
+def init_connection():
+    """Returns the Supabase client shared by all pages."""
+    url = st.secrets["SUPABASE_URL"]
+    key = st.secrets["SUPABASE_KEY"]
+    http_client = httpx.Client(limits=POOL_LIMITS, timeout=TIMEOUT)
+    try:
+        options = ClientOptions(httpx_client=http_client, postgrest_client_timeout=TIMEOUT)
+    except TypeError:
+        # Older supabase releases can't take a custom HTTP client; keep at least the timeouts.
+        http_client.close()
+        options = ClientOptions(postgrest_client_timeout=TIMEOUT)
+    return create_client(url, key, options=options)
+
+
+def _ping():
+    try:
+        init_connection().table("tbl_ctro_cto").select("id").limit(1).execute()
+    except Exception:
+        logger.exception("Could not warm the Supabase connection")
+
+
+@st.cache_resource(show_spinner=False)
+def warm_connection():
+    """
+    Opens the pooled connection (DNS, TLS) in the background, ahead of the first real query.
+    The pool is process-wide, so this runs once per process, not once per session.
+    """
+    thread = threading.Thread(target=_ping, daemon=True)
+    thread.start()
+    return thread
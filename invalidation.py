@@ -0,0 +1,73 @@
+import threading
+from collections import deque
+
+import streamlit as st
+
+# How many write events are kept. A subscriber that falls further behind
+# than this can no longer patch and must reload the whole table.
+MAX_EVENTS = 1000
+
+
+class InvalidationBus:
+    """Process-wide log of writes, so caches can patch only what changed."""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=max_events)
+        self._seq = 0
+
+    @property
+    def seq(self):
+        """Sequence number of the last published event."""
+        with self._lock:
+            return self._seq
+
+    def publish(self, table_name, action, ids=None):
+        """
+        Records an 'insert', 'update' or 'delete' on `table_name`.
+        `ids=None` means the affected rows are unknown.
+        """
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, table_name, action, None if ids is None else frozenset(ids)))
+            return self._seq
+
+    def changes_since(self, seq, table_name):
+        """
+        Returns `(changes, current_seq)` for `table_name` after `seq`.
+        `changes` is a `(changed_ids, deleted_ids)` pair, or None when the
+        caller cannot patch and has to reload the table.
+        """
+        with self._lock:
+            current_seq = self._seq
+            if self._events and self._events[0][0] > seq + 1:
+                return None, current_seq
+            changed, deleted = set(), set()
+            for event_seq, event_table, action, ids in self._events:
+                if event_seq <= seq or event_table != table_name:
+                    continue
+                if ids is None:
+                    return None, current_seq
+                if action == "delete":
+                    changed.difference_update(ids)
+                    deleted.update(ids)
+                else:
+                    deleted.difference_update(ids)
+                    changed.update(ids)
+            return (changed, deleted), current_seq
+
+
+@st.cache_resource
+def get_bus():
+    return InvalidationBus()
+
+
+def publish(table_name, action, ids=None):
+    """Publishes a write so other pages and sessions drop stale entries."""
+    return get_bus().publish(table_name, action, ids)
+
+
+def ids_from_response(response):
+    """Row ids returned by an insert/update response, or None if it has none."""
+    ids = [row["id"] for row in (response.data or []) if "id" in row]
+    return ids or None
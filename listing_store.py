@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from db import init_connection
+from invalidation import get_bus
+from lookups import fetch_lookup
+
+logger = logging.getLogger(__name__)
+
+# Listings are patched from the invalidation bus; a full reload is only done
+# after this many seconds, to pick up writes made outside the app.
+LISTING_TTL = 600
+
+# Above this many changed rows (e.g. after a bulk load) the table is reloaded
+# instead of patched, so the `in.(...)` filter never outgrows the URL limit.
+MAX_PATCH_IDS = 200
+
+# Forced reloads ("Refrescar") within this many seconds of the last full load
+# only sync from the bus, so many users refreshing don't each re-download the table.
+MIN_RELOAD_INTERVAL = 30
+
+# After a failed fetch, the backend is not retried for this many seconds, so
+# sessions don't queue on the store lock behind one timeout after another.
+RETRY_BACKOFF = 30
+
+# Repeated name columns are stored as categoricals (dictionary-encoded).
+CATEGORICAL_COLUMNS = ("rubro", "pda", "pda_gral", "nombre_ctro_cto", "ctro_cto", "usuario")
+
+# Join keys duplicated by the manual merges in Informes (same as id_partida / id_ctro_cto).
+REDUNDANT_COLUMNS = ("partida_id", "ctro_cto_id")
+
+# (table_name, source, is_ejecucion) for each listing shown in Informes.
+# Presupuesto reads from its view; Ejecucion is joined manually.
+LISTINGS = (
+    ("tbl_movimientos", "vw_movimientos", False),
+    ("tbl_ejecucion", "tbl_ejecucion", True),
+)
+
+
+def encode(df):
+    """Returns `df` with redundant columns dropped and name columns as categoricals."""
+    df = df.drop(columns=[c for c in REDUNDANT_COLUMNS if c in df.columns])
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and df[column].dtype != "category":
+            df[column] = df[column].astype("category")
+    return df
+
+
+class ListingUnavailable(Exception):
+    """The store has no data yet and loading it failed."""
+
+
+class ListingStore:
+    """
+    A single process-wide copy of a listing, shared by every session.
+    Frames handed out are never mutated: updates build a new frame and swap it in.
+    """
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self._lock = threading.RLock()
+        self._df = None
+        self._seq = 0
+        self._loaded_at = 0.0
+        self._failed_at = float("-inf")
+        self._last_error = None
+        self._views = {}
+
+    def snapshot(self, fetch, max_age=LISTING_TTL):
+        """
+        Brings the store up to date and returns the full frame.
+        `fetch(ids=None)` must return the listing (or only the given ids) for all centros de costo.
+        Raises ListingUnavailable if there is no frame to serve.
+        """
+        with self._lock:
+            if time.monotonic() - self._failed_at >= RETRY_BACKOFF:
+                try:
+                    age = time.monotonic() - self._loaded_at
+                    if self._df is None or age > max(max_age, MIN_RELOAD_INTERVAL):
+                        self._reload(fetch)
+                    else:
+                        self._sync(fetch)
+                    self._last_error = None
+                except Exception as e:
+                    # Keep serving the last good frame; the bus position is not advanced,
+                    # so the retry after the backoff re-applies the same changes.
+                    logger.exception("Could not update the listing store for %s", self.table_name)
+                    self._failed_at = time.monotonic()
+                    self._last_error = e
+            if self._df is None:
+                raise ListingUnavailable(str(self._last_error)) from self._last_error
+            return self._df
+
+    def view(self, fetch, ctro_cto_id=None, all_rows=False, max_age=LISTING_TTL):
+        """
+        Rows for one centro de costo, or every row if `all_rows` (superusers).
+        Without `all_rows`, a missing `ctro_cto_id` gets an empty frame, never the whole table.
+        """
+        with self._lock:
+            df = self.snapshot(fetch, max_age)
+            if all_rows or df.empty:
+                return df
+            if ctro_cto_id is None:
+                return df.iloc[0:0]
+            if ctro_cto_id not in self._views:
+                self._views[ctro_cto_id] = df[df['id_ctro_cto'] == ctro_cto_id].reset_index(drop=True)
+            return self._views[ctro_cto_id]
+
+    def _replace(self, df):
+        self._df = df
+        self._views = {}
+
+    def _reload(self, fetch):
+        # Taken before the query so writes racing with it are re-applied later.
+        seq = get_bus().seq
+        self._replace(encode(fetch()))
+        self._seq = seq
+        self._loaded_at = time.monotonic()
+
+    def _sync(self, fetch):
+        changes, seq = get_bus().changes_since(self._seq, self.table_name)
+        if changes is None:
+            self._reload(fetch)
+            return
+
+        changed_ids, deleted_ids = changes
+        if len(changed_ids) > MAX_PATCH_IDS:
+            self._reload(fetch)
+            return
+        if changed_ids or deleted_ids:
+            df = self._df
+            if 'id' in df.columns:
+                df = df[~df['id'].isin(changed_ids | deleted_ids)]
+            if changed_ids:
+                # Only the changed rows are re-read; the rest of the frame is kept.
+                fresh_df = fetch(ids=changed_ids)
+                if not fresh_df.empty:
+                    df = pd.concat([fresh_df, df], ignore_index=True)
+                    df = df.sort_values('id', ascending=False, ignore_index=True)
+            self._replace(encode(df))
+        self._seq = seq
+
+
+@st.cache_resource
+def get_store(table_name):
+    """Shared store for `table_name`."""
+    return ListingStore(table_name)
+
+
+def fetch_listing(source, is_ejecucion, ids=None):
+    """
+    Fetches data for all centros de costo (optionally only the given ids) and merges it with lookup tables.
+    The result feeds the shared listing store; sessions filter it by centro de costo.
+    """
+    query = init_connection().table(source).select("*")
+    if ids is not None:
+        query = query.in_('id', list(ids))
+
+    response = query.order('id', desc=True).execute()
+
+    if hasattr(response, 'error') and response.error or not response.data:
+        return pd.DataFrame()
+
+    data_df = pd.DataFrame(response.data)
+
+    # Manual join if it's ejecucion data
+    if is_ejecucion:
+        partidas_df = pd.DataFrame(fetch_lookup("tbl_partidas"))
+        ctros_cto_df = pd.DataFrame(fetch_lookup("tbl_ctro_cto"))
+        data_df = data_df.merge(partidas_df.add_prefix('partida_'), left_on='id_partida', right_on='partida_id', how='left')
+        data_df = data_df.merge(ctros_cto_df.add_prefix('ctro_cto_'), left_on='id_ctro_cto', right_on='ctro_cto_id', how='left')
+        data_df.rename(columns={'ctro_cto_nombre': 'nombre_ctro_cto', 'partida_rubro': 'rubro', 'partida_pda_gral': 'pda_gral', 'partida_pda': 'pda'}, inplace=True)
+
+    return data_df
+
+
+def get_listing(table_name, source, is_ejecucion, ctro_cto_id=None, all_rows=False, force_reload=False):
+    """
+    Returns the shared listing for `table_name`, filtered to `ctro_cto_id` unless `all_rows`.
+    `force_reload` re-reads the whole table, picking up writes made outside the app.
+    """
+    store = get_store(table_name)
+    fetch = lambda ids=None: fetch_listing(source, is_ejecucion, ids)
+    return store.view(fetch, ctro_cto_id, all_rows, max_age=0 if force_reload else LISTING_TTL)
@@ -0,0 +1,34 @@
+import logging
+
+import streamlit as st
+
+from db import init_connection
+
+logger = logging.getLogger(__name__)
+
+# Lookup tables are only edited outside the app, so nothing publishes their
+# writes to the invalidation bus; the TTL is what bounds how long they stay stale.
+LOOKUP_TTL = 600
+
+# Lookup tables and the columns the pages need from them.
+LOOKUP_TABLES = {
+    "tbl_ctro_cto": "id, nombre",
+    "tbl_users": "id, usuario",
+    "tbl_partidas": "id, rubro, pda, pda_gral",
+}
+
+
+# Errors propagate so a failed query is never cached for the whole TTL.
+@st.cache_data(ttl=LOOKUP_TTL)
+def fetch_data(table_name, columns):
+    return init_connection().table(table_name).select(columns).execute().data
+
+
+def fetch_lookup(table_name):
+    """Rows of a lookup table, shared by every page and session."""
+    try:
+        return fetch_data(table_name, LOOKUP_TABLES[table_name])
+    except Exception as e:
+        logger.exception("Could not load lookup table %s", table_name)
+        st.error(f"Error cargando datos de '{table_name}': {e}")
+        return []
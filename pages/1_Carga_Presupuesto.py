@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-from supabase import create_client, Client
+from db import init_connection
+from invalidation import ids_from_response, publish
+from lookups import fetch_lookup
+from parsing import parse_amounts, read_upload
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Carga Presupuesto", page_icon="📤")
@@ -17,27 +20,13 @@ user_ctro_cto_id = user.get("id_ctro_cto")
 is_superuser = (user_ctro_cto_id == 25)
 
 # --- SUPABASE CONNECTION ---
-@st.cache_resource
-def init_connection():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
 supabase = init_connection()
 
 # --- DATA FETCHING & FILTERING ---
-@st.cache_data(ttl=600)
-def fetch_data(table_name, columns):
-    try:
-        return supabase.table(table_name).select(columns).execute().data
-    except Exception as e:
-        st.error(f"Error cargando datos de '{table_name}': {e}")
-        return []
-
-# Fetch all data
-all_ctros_cto_data = fetch_data("tbl_ctro_cto", "id, nombre")
-users_data = fetch_data("tbl_users", "id, usuario")
-partidas_data = fetch_data("tbl_partidas", "id, rubro, pda, pda_gral")
+# Fetch all data (cached and shared with the other pages)
+all_ctros_cto_data = fetch_lookup("tbl_ctro_cto")
+users_data = fetch_lookup("tbl_users")
+partidas_data = fetch_lookup("tbl_partidas")
 
 # Filter Centro de Costo data based on user permissions
 if is_superuser:
@@ -113,6 +102,7 @@ with tab1:
                         if hasattr(response, 'error') and response.error:
                             st.error(f"Error al guardar: {response.error.message}")
                         else:
+                            publish("tbl_movimientos", "insert", ids_from_response(response))
                             st.success("¡Movimiento guardado con éxito!")
                             st.toast("¡Movimiento guardado con éxito!")
                     except Exception as e:
@@ -125,13 +115,13 @@ with tab2:
         **Instrucciones:**
         1. Sube un archivo CSV o Excel (.xlsx).
         2. El archivo debe contener las siguientes columnas obligatorias:
-           - `saldo`, `id_ejercicio`, `descripcion`, `rubro`, `pda_gral`, `pda`, `id_ctro_cto`, `nombre_usuario`
+           - `saldo` (ej. 1.234.567,89), `id_ejercicio`, `descripcion`, `rubro`, `pda_gral`, `pda`, `id_ctro_cto`, `nombre_usuario`
         3. Si tu usuario no es administrador, todos los registros deben pertenecer a tu centro de costo (usando el ID correcto).
     """)
     uploaded_file = st.file_uploader("Elige un archivo CSV o Excel", type=["csv", "xlsx"], key="bulk_uploader")
     if uploaded_file:
         try:
-            df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith('.csv') else pd.read_excel(uploaded_file)
+            df = read_upload(uploaded_file, text_columns=("saldo",))
             
             # Normalize column names: strip whitespace and convert to lower case
             df.columns = df.columns.str.strip().str.lower()
@@ -160,6 +150,9 @@ with tab2:
                     if not errors:
                         # Convert id_ctro_cto to a numeric type, coercing errors to NaN.
                         df['id_ctro_cto'] = pd.to_numeric(df['id_ctro_cto'], errors='coerce')
+                        # Parse saldo column-wise; the format is detected once for the whole column.
+                        raw_saldo = df['saldo'].copy()
+                        df['saldo'], invalid_saldo = parse_amounts(df['saldo'])
 
                         # --- DATA PROCESSING ---
                         for index, row in df.iterrows():
@@ -174,6 +167,10 @@ with tab2:
                                 if id_ctro_cto not in valid_ctro_cto_ids:
                                     raise ValueError(f"El id_ctro_cto '{id_ctro_cto}' no es válido o no tienes permiso para usarlo.")
 
+                                # Validate saldo
+                                if invalid_saldo[index]:
+                                    raise ValueError(f"El 'saldo' '{raw_saldo[index]}' está vacío o no es un importe válido.")
+
                                 # Lookups for partida and user
                                 match_df = partidas_df[(partidas_df['rubro'] == row['rubro']) & (partidas_df['pda_gral'] == row['pda_gral']) & (partidas_df['pda'] == row['pda'])]
                                 if len(match_df) != 1:
@@ -210,6 +207,7 @@ with tab2:
                             if hasattr(response, 'error') and response.error:
                                 st.error(f"Error en la carga masiva: {response.error.message}")
                             else:
+                                publish("tbl_movimientos", "insert", ids_from_response(response))
                                 st.success(f"¡Éxito! Se han cargado {len(records_to_insert)} registros.")
                                 st.toast(f"¡Éxito! Se han cargado {len(records_to_insert)} registros.")
                         except Exception as e:
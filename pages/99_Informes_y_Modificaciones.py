@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
-from supabase import create_client
+from db import init_connection
 import io
 from datetime import datetime
+from invalidation import get_bus, ids_from_response, publish
+from listing_store import ListingUnavailable, get_listing
+from lookups import fetch_lookup
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Informes y Modificaciones", page_icon="📊", layout="wide")
@@ -14,22 +17,12 @@ if "user" not in st.session_state:
     st.stop()
 
 # --- SUPABASE CONNECTION & INITIAL DATA ---
-@st.cache_resource
-def init_connection():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
 supabase = init_connection()
 
-@st.cache_data(ttl=600)
-def fetch_lookup_data():
-    ctros_cto = pd.DataFrame(supabase.table("tbl_ctro_cto").select("id, nombre").execute().data)
-    users = pd.DataFrame(supabase.table("tbl_users").select("id, usuario").execute().data)
-    partidas = pd.DataFrame(supabase.table("tbl_partidas").select("id, rubro, pda, pda_gral").execute().data)
-    return ctros_cto, users, partidas
-
-ctros_cto_df, users_df, partidas_df = fetch_lookup_data()
+# Lookups are cached and shared with the other pages
+ctros_cto_df = pd.DataFrame(fetch_lookup("tbl_ctro_cto"))
+users_df = pd.DataFrame(fetch_lookup("tbl_users"))
+partidas_df = pd.DataFrame(fetch_lookup("tbl_partidas"))
 user_info = st.session_state["user"]
 user_ctro_cto_id = user_info.get("id_ctro_cto")
 is_superuser = (user_ctro_cto_id == 25)
@@ -52,32 +45,13 @@ def render_tab_content(data_source_name, table_name, view_name, key_prefix, is_e
     with sub_tab2:
         handle_search_and_modify(table_name, key_prefix, is_ejecucion)
 
-def get_full_data(table_name, is_ejecucion):
-    """Fetches data and merges it with lookup tables."""
-    query = supabase.table(table_name).select("*")
-    if not is_superuser:
-        query = query.eq('id_ctro_cto', user_ctro_cto_id)
-    
-    response = query.order('id', desc=True).execute()
-
-    if hasattr(response, 'error') and response.error or not response.data:
-        return pd.DataFrame()
-
-    data_df = pd.DataFrame(response.data)
-
-    # Manual join if it's ejecucion data
-    if is_ejecucion:
-        data_df = data_df.merge(partidas_df.add_prefix('partida_'), left_on='id_partida', right_on='partida_id', how='left')
-        data_df = data_df.merge(ctros_cto_df.add_prefix('ctro_cto_'), left_on='id_ctro_cto', right_on='ctro_cto_id', how='left')
-        data_df.rename(columns={'ctro_cto_nombre': 'nombre_ctro_cto', 'partida_rubro': 'rubro', 'partida_pda_gral': 'pda_gral', 'partida_pda': 'pda'}, inplace=True)
-    
-    return data_df
-
 def handle_listing_and_deleting(table_name, view_name, key_prefix, is_ejecucion):
     """Logic for the 'Listado' sub-tab."""
     
-    df_session_key = f'{key_prefix}_df'
+    loaded_session_key = f'{key_prefix}_loaded'
     delete_session_key = f'{key_prefix}_ids_to_delete'
+    # For Presupuesto, use the view. For Ejecucion, build it manually.
+    source = view_name if not is_ejecucion else table_name
 
     # --- DELETE CONFIRMATION UI ---
     if delete_session_key in st.session_state and st.session_state[delete_session_key]:
@@ -86,10 +60,13 @@ def handle_listing_and_deleting(table_name, view_name, key_prefix, is_ejecucion)
             st.warning(f"**¿Estás seguro de que quieres borrar {len(ids)} registro(s)?**")
             col1, col2 = st.columns(2)
             if col1.button("Sí, borrar", key=f"{key_prefix}_confirm_delete"):
-                supabase.table(table_name).delete().in_('id', ids).execute()
-                st.success(f"{len(ids)} registro(s) borrado(s).")
+                response = supabase.table(table_name).delete().in_('id', ids).execute()
+                # Publish only the rows the backend reports as deleted; RLS can turn a delete into a no-op.
+                deleted_ids = ids_from_response(response)
+                if deleted_ids:
+                    publish(table_name, "delete", deleted_ids)
+                st.success(f"{len(deleted_ids or [])} registro(s) borrado(s).")
                 del st.session_state[delete_session_key]
-                if df_session_key in st.session_state: del st.session_state[df_session_key]
                 st.rerun()
             if col2.button("No, cancelar", key=f"{key_prefix}_cancel_delete"):
                 del st.session_state[delete_session_key]
@@ -99,27 +76,33 @@ def handle_listing_and_deleting(table_name, view_name, key_prefix, is_ejecucion)
     if not is_superuser:
         st.info(f"Mostrando solo registros para tu centro de costo.")
 
-    if st.button(f"Refrescar / Cargar {table_name}", key=f"{key_prefix}_refresh"):
-        with st.spinner("Cargando datos..."):
-            # For Presupuesto, use the view. For Ejecucion, build it manually.
-            source = view_name if not is_ejecucion else table_name
-            df = get_full_data(source, is_ejecucion)
-            if not df.empty:
-                df["Borrar"] = False
-            st.session_state[df_session_key] = df
+    # The session only remembers that the listing was requested; the data lives in the shared store.
+    # Clicking the button reloads the store (at most every MIN_RELOAD_INTERVAL seconds) to pick up
+    # writes made outside the app; otherwise it only applies the changes published by the app.
+    refresh_clicked = st.button(f"Refrescar / Cargar {table_name}", key=f"{key_prefix}_refresh")
+    if refresh_clicked:
+        st.session_state[loaded_session_key] = True
+
+    if st.session_state.get(loaded_session_key):
+        try:
+            with st.spinner("Cargando datos..."):
+                listing_df = get_listing(table_name, source, is_ejecucion, user_ctro_cto_id, all_rows=is_superuser, force_reload=refresh_clicked)
+        except ListingUnavailable as e:
+            st.error(f"Error cargando datos de '{table_name}': {e}")
+            listing_df = pd.DataFrame()
+    else:
+        listing_df = pd.DataFrame()
     
-    if df_session_key in st.session_state and not st.session_state[df_session_key].empty:
-        df = st.session_state[df_session_key]
-        
+    if not listing_df.empty:
         # Display metrics and download button
-        total_saldo = pd.to_numeric(df['saldo']).sum()
+        total_saldo = pd.to_numeric(listing_df['saldo']).sum()
         st.metric(label=f"Saldo Total ({key_prefix.capitalize()})", value=f"${total_saldo:,.2f}")
         
-        excel_data = to_excel(df.drop(columns=['Borrar']))
+        excel_data = to_excel(listing_df)
         st.download_button(label="📥 Descargar a Excel", data=excel_data, file_name=f"informe_{key_prefix}.xlsx", use_container_width=True)
         
         st.info("Selecciona las filas a eliminar y presiona 'Borrar Seleccionados'.")
-        edited_df = st.data_editor(df, key=f"{key_prefix}_editor", use_container_width=True, hide_index=True)
+        edited_df = st.data_editor(listing_df.assign(Borrar=False), key=f"{key_prefix}_editor", use_container_width=True, hide_index=True)
 
         if st.button("Borrar Seleccionados", key=f"{key_prefix}_delete_selected"):
             ids_to_delete = edited_df[edited_df["Borrar"] == True]["id"].tolist()
@@ -140,10 +123,12 @@ def to_excel(df_to_convert):
 def handle_search_and_modify(table_name, key_prefix, is_ejecucion):
     """Logic for the 'Buscar y Modificar' sub-tab."""
     search_session_key = f'{key_prefix}_encontrado'
+    search_seq_key = f'{key_prefix}_encontrado_seq'
     search_id = st.number_input("Ingresa el ID del registro a buscar", min_value=1, step=1, key=f"{key_prefix}_search_id")
 
     if st.button("Buscar", key=f"{key_prefix}_search_button"):
         with st.spinner("Buscando..."):
+            st.session_state[search_seq_key] = get_bus().seq
             response = supabase.table(table_name).select("*").eq("id", search_id).execute()
             if response.data:
                 st.session_state[search_session_key] = response.data[0]
@@ -153,6 +138,14 @@ def handle_search_and_modify(table_name, key_prefix, is_ejecucion):
                     del st.session_state[search_session_key]
 
     if search_session_key in st.session_state:
+        # Drop the found record if someone else changed or deleted it meanwhile
+        changes, seq = get_bus().changes_since(st.session_state.get(search_seq_key, 0), table_name)
+        st.session_state[search_seq_key] = seq
+        if changes is None or st.session_state[search_session_key]['id'] in changes[0] | changes[1]:
+            del st.session_state[search_session_key]
+            st.warning("El registro fue modificado o borrado desde otra sesión. Búscalo de nuevo.")
+            return
+
         registro = st.session_state[search_session_key]
         st.success(f"Registro con ID {registro['id']} encontrado.")
 
@@ -214,6 +207,9 @@ def render_edit_form(item, table_name, key_prefix, session_key_to_clear, is_ejec
             if hasattr(response, 'error') and response.error:
                 st.error(f"Error al actualizar: {response.error.message}")
             else:
+                updated_ids = ids_from_response(response)
+                if updated_ids:
+                    publish(table_name, "update", updated_ids)
                 st.success("¡Registro actualizado con éxito!")
                 del st.session_state[session_key_to_clear]
                 st.rerun()
@@ -0,0 +1,140 @@
+import math
+import numbers
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+from pandas.api.types import infer_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+# Amount formats: Argentine "1.234.567,89" and international "1,234,567.89".
+# Each entry is (thousands separator, decimal separator, pattern).
+AMOUNT_FORMATS = (
+    (".", ",", r"[+-]?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?"),
+    (",", ".", r"[+-]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?"),
+)
+
+# Tried in order; on a tie the first one (dd/mm/yyyy) wins.
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y", "%Y/%m/%d", "%d.%m.%Y")
+
+# CSV separators, detected from the header line. Argentine exports usually use
+# ";" because "," is the decimal separator. On a tie the first one wins.
+CSV_SEPARATORS = (",", ";", "\t")
+
+# Number of values inspected to detect the format of a column.
+SAMPLE_SIZE = 200
+
+
+def _as_text(series):
+    return series.astype("string").str.strip().replace("", pd.NA)
+
+
+def _is_all_text(series):
+    # A single C-level pass; CSV columns read as text always pass it.
+    return infer_dtype(series, skipna=True) in ("string", "empty")
+
+
+def _is_text(value):
+    return isinstance(value, str)
+
+
+def _is_number(value):
+    return isinstance(value, (numbers.Real, Decimal)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_date(value):
+    # Covers pd.Timestamp and datetime.datetime, both subclasses of date.
+    return isinstance(value, date) and not pd.isna(value)
+
+
+def _parse_amount_text(text):
+    text = text.str.replace(r"[\s$]", "", regex=True)
+    sample = text.dropna().head(SAMPLE_SIZE)
+    thousands, decimal, pattern = max(
+        AMOUNT_FORMATS, key=lambda fmt: sample.str.fullmatch(fmt[2]).sum()
+    )
+    matches = text.str.fullmatch(pattern).fillna(False).astype(bool)
+    parsed = text.str.replace(thousands, "", regex=False).str.replace(decimal, ".", regex=False)
+    return parsed.astype(object).mask(~matches, None)
+
+
+def _parse_date_text(text):
+    # Drop a trailing time part, as in "31/01/2024 00:00:00".
+    text = text.str.replace(r"[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?$", "", regex=True)
+    sample = text.dropna().head(SAMPLE_SIZE)
+    date_format = max(
+        DATE_FORMATS, key=lambda fmt: pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+    )
+    return pd.to_datetime(text, format=date_format, errors="coerce")
+
+
+def parse_amounts(series):
+    """
+    Parses a column of amounts, detecting its format once for the whole column.
+    Returns `(values, invalid)`: exact decimal strings such as "1234567.89"
+    (None where invalid) and a boolean mask of the rows that could not be parsed.
+    """
+    if is_numeric_dtype(series):
+        # Typed cells (e.g. Excel numbers): the shortest repr is the exact value entered.
+        invalid = series.isna()
+        return series.astype(str).astype(object).mask(invalid, None), invalid
+
+    if _is_all_text(series):
+        values = _parse_amount_text(_as_text(series))
+    else:
+        # Mixed Excel columns: typed numbers keep their exact repr, and only real
+        # text cells go through format detection.
+        values = pd.Series(None, index=series.index, dtype=object)
+        is_number = series.map(_is_number).astype(bool)
+        values[is_number] = series[is_number].map(str)
+        is_text = series.map(_is_text).astype(bool)
+        values[is_text] = _parse_amount_text(_as_text(series[is_text]))
+
+    invalid = values.isna()
+    return values.mask(invalid, None), invalid
+
+
+def parse_dates(series):
+    """
+    Parses a column of dates, detecting its format once for the whole column.
+    Returns `(values, invalid)`: "YYYY-MM-DD" strings (None where invalid)
+    and a boolean mask of the rows that could not be parsed.
+    """
+    if is_datetime64_any_dtype(series):
+        dates = series
+    elif _is_all_text(series):
+        dates = _parse_date_text(_as_text(series))
+    else:
+        dates = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+
+        # Mixed Excel columns: typed date cells are taken as they are (tz-aware
+        # ones keep their local date, since the column holds naive timestamps).
+        is_date = series.map(_is_date).astype(bool)
+        dates[is_date] = pd.to_datetime(series[is_date].map(lambda v: pd.Timestamp(v).tz_localize(None)))
+        is_text = series.map(_is_text).astype(bool)
+        dates[is_text] = _parse_date_text(_as_text(series[is_text]))
+
+    invalid = dates.isna()
+    return dates.dt.strftime("%Y-%m-%d").astype(object).mask(invalid, None), invalid
+
+
+def _sniff_separator(uploaded_file):
+    # The header holds only column names, so counting separators there is reliable.
+    header_line = uploaded_file.readline()
+    uploaded_file.seek(0)
+    if isinstance(header_line, bytes):
+        header_line = header_line.decode("utf-8", errors="ignore")
+    return max(CSV_SEPARATORS, key=header_line.count)
+
+
+def read_upload(uploaded_file, text_columns=("saldo", "id_ejercicio")):
+    """
+    Reads an uploaded CSV or Excel file, detecting the CSV separator. CSV columns named in
+    `text_columns` are kept as text so amounts and dates keep their original format until parsed.
+    """
+    if not uploaded_file.name.endswith('.csv'):
+        return pd.read_excel(uploaded_file)
+    sep = _sniff_separator(uploaded_file)
+    header = pd.read_csv(uploaded_file, sep=sep, nrows=0).columns
+    uploaded_file.seek(0)
+    dtype = {column: str for column in header if column.strip().lower() in text_columns}
+    return pd.read_csv(uploaded_file, sep=sep, dtype=dtype)
@@ -0,0 +1,28 @@
+import logging
+import threading
+
+from listing_store import LISTINGS, get_listing
+from lookups import LOOKUP_TABLES, fetch_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def _prewarm(ctro_cto_id, all_rows):
+    try:
+        for table_name in LOOKUP_TABLES:
+            fetch_lookup(table_name)
+        for table_name, source, is_ejecucion in LISTINGS:
+            get_listing(table_name, source, is_ejecucion, ctro_cto_id, all_rows=all_rows)
+    except Exception:
+        # Prewarming is best effort; the pages load whatever is still cold.
+        logger.exception("Cache prewarm failed")
+
+
+def start_prewarm(user):
+    """
+    Loads the lookup tables and the user's Presupuesto and Ejecucion listings
+    in the background, so the first page visit renders from a warm cache.
+    """
+    user_ctro_cto_id = user.get("id_ctro_cto")
+    is_superuser = (user_ctro_cto_id == 25)
+    threading.Thread(target=_prewarm, args=(user_ctro_cto_id, is_superuser), daemon=True).start()